@@ -1,11 +1,10 @@
 import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
-import json
-import os
 import ctypes
 from ctypes import windll
 from PIL import Image, ImageDraw, ImageTk
+from todo_engine import TodoEngine, classify_deadline, OVERDUE, TODAY, SOON
 
 class ModernTodoApp:
     def __init__(self):
@@ -58,7 +57,13 @@ class ModernTodoApp:
         
         # 数据文件路径
         self.data_file = "todos.json"
-        self.todos = self.load_todos()
+        self.engine = TodoEngine(self.data_file)
+        self.engine.subscribe(self.on_engine_event)
+        
+        # todo_id -> 卡片组件
+        self.cards = {}
+        # 批量修改时合并统计和滚动条的刷新
+        self.pending_refresh = None
         
         # 用于拖动和调整大小
         self.drag_start_x = 0
@@ -129,6 +134,25 @@ class ModernTodoApp:
         controls = tk.Frame(title_frame, bg=self.bg_color)
         controls.pack(side=tk.RIGHT)
         
+        # 撤销/重做按钮（不可用时置灰）
+        self.undo_btn = tk.Label(controls, text="↶",
+                                bg=self.bg_color, fg=self.border_color,
+                                font=("Arial", 16))
+        self.undo_btn.pack(side=tk.LEFT, padx=5)
+        self.undo_btn.bind('<Button-1>', lambda e: self.undo())
+        self.undo_btn.bind('<Enter>', lambda e: self.engine.can_undo() and
+                           self.undo_btn.config(fg=self.text_primary))
+        self.undo_btn.bind('<Leave>', lambda e: self.update_history_buttons())
+        
+        self.redo_btn = tk.Label(controls, text="↷",
+                                bg=self.bg_color, fg=self.border_color,
+                                font=("Arial", 16))
+        self.redo_btn.pack(side=tk.LEFT, padx=5)
+        self.redo_btn.bind('<Button-1>', lambda e: self.redo())
+        self.redo_btn.bind('<Enter>', lambda e: self.engine.can_redo() and
+                           self.redo_btn.config(fg=self.text_primary))
+        self.redo_btn.bind('<Leave>', lambda e: self.update_history_buttons())
+        
         # 最小化按钮
         minimize_btn = tk.Label(controls, text="─",
                                bg=self.bg_color, fg=self.text_secondary,
@@ -285,6 +309,13 @@ class ModernTodoApp:
         self.root.bind('<B1-Motion>', self.do_resize)
         self.root.bind('<ButtonRelease-1>', self.stop_resize)
         
+        # 撤销/重做快捷键（输入框中不触发）
+        self.root.bind('<Control-z>', self.on_undo_key)
+        self.root.bind('<Control-y>', self.on_redo_key)
+        self.root.bind('<Control-Z>', self.on_undo_key)  # 大写锁定时
+        self.root.bind('<Control-Shift-Z>', self.on_redo_key)
+        self.root.bind('<Control-Shift-z>', self.on_redo_key)
+        
     def check_resize_cursor(self, event):
         """检查鼠标位置并改变光标"""
         if hasattr(self, 'resizing') and self.resizing:
@@ -483,34 +514,64 @@ class ModernTodoApp:
         date = self.date_entry.get().strip()
         time = self.time_entry.get().strip()
         
-        todo = {
-            "task": task,
-            "ddl": f"{date} {time}",
-            "completed": False,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        self.todos.append(todo)
-        self.save_todos()
+        self.engine.add(task, f"{date} {time}")
         self.task_entry.delete(0, tk.END)
         self.task_entry.insert(0, "")
         self.task_entry.config(fg=self.text_secondary)
-        self.refresh_todo_list()
         
-    def toggle_complete(self, index):
-        self.todos[index]["completed"] = not self.todos[index]["completed"]
-        self.save_todos()
-        self.refresh_todo_list()
+    def toggle_complete(self, todo_id):
+        self.engine.toggle(todo_id)
         
-    def delete_todo(self, index):
-        del self.todos[index]
-        self.save_todos()
-        self.refresh_todo_list()
+    def delete_todo(self, todo_id):
+        self.engine.delete(todo_id)
+        
+    def undo(self):
+        self.engine.undo()
+        
+    def redo(self):
+        self.engine.redo()
+        
+    def on_undo_key(self, event):
+        if not isinstance(self.root.focus_get(), tk.Entry):
+            self.undo()
+            
+    def on_redo_key(self, event):
+        if not isinstance(self.root.focus_get(), tk.Entry):
+            self.redo()
+            
+    def update_history_buttons(self):
+        """根据是否可撤销/重做更新按钮颜色"""
+        for btn, enabled in ((self.undo_btn, self.engine.can_undo()),
+                             (self.redo_btn, self.engine.can_redo())):
+            btn.config(fg=self.text_secondary if enabled else self.border_color,
+                       cursor="hand2" if enabled else "")
+        
+    def on_engine_event(self, event, todo_id, todo):
+        """数据变更时只更新受影响的卡片"""
+        if event == "reset":
+            if hasattr(self, 'todo_frame'):
+                self.refresh_todo_list()
+            return
+            
+        card = self.cards.pop(todo_id, None)
+        if card is not None:
+            card.destroy()
+        if event != "removed":
+            next_id = self.engine.next_id(todo_id)
+            self.create_todo_item(todo_id, todo, before=self.cards.get(next_id))
+            
+        if self.pending_refresh is None:
+            self.pending_refresh = self.root.after_idle(self.flush_refresh)
+            
+    def flush_refresh(self):
+        """一批事件处理完后统一刷新统计和滚动条"""
+        self.pending_refresh = None
+        self.update_stats()
+        self.update_history_buttons()
+        self.root.after(100, self.update_scrollbar)
         
     def update_stats(self):
-        total = len(self.todos)
-        completed = sum(1 for todo in self.todos if todo["completed"])
-        pending = total - completed
+        total, completed, pending = self.engine.stats()
         
         if total == 0:
             stats_text = "暂无待办事项"
@@ -523,45 +584,25 @@ class ModernTodoApp:
         # 清空现有列表
         for widget in self.todo_frame.winfo_children():
             widget.destroy()
+        self.cards = {}
             
         # 更新统计
         self.update_stats()
         
-        # 分离未完成和已完成的任务
-        pending_todos = []
-        completed_todos = []
-        
-        for idx, todo in enumerate(self.todos):
-            if todo["completed"]:
-                completed_todos.append((idx, todo))
-            else:
-                pending_todos.append((idx, todo))
-        
-        # 对未完成任务按DDL排序
-        pending_todos.sort(key=lambda x: x[1]["ddl"])
-        
-        # 对已完成任务按完成时间排序（如果有的话，否则按DDL）
-        completed_todos.sort(key=lambda x: x[1].get("completed_at", x[1]["ddl"]))
-        
-        # 先显示未完成的任务
-        for original_idx, todo in pending_todos:
-            card = self.create_todo_item(original_idx, todo)
-            self.bind_mousewheel(card)
-        
-        # 再显示已完成的任务
-        for original_idx, todo in completed_todos:
-            card = self.create_todo_item(original_idx, todo)
-            self.bind_mousewheel(card)
+        # 未完成的任务按DDL在前，已完成的在后（顺序由engine索引维护）
+        for todo_id, todo in self.engine.ordered():
+            self.create_todo_item(todo_id, todo)
             
         # 刷新后更新滚动条
         self.root.after(100, self.update_scrollbar)
             
-    def create_todo_item(self, index, todo):
+    def create_todo_item(self, todo_id, todo, before=None):
         # 卡片容器 - 填充整个宽度
         card = tk.Frame(self.todo_frame, bg="white",
                        highlightbackground=self.border_color,
                        highlightthickness=1)
-        card.pack(fill=tk.X, expand=True, pady=(0, 8))
+        card.pack(fill=tk.X, expand=True, pady=(0, 8), before=before)
+        self.cards[todo_id] = card
         
         # 内容容器
         content = tk.Frame(card, bg="white")
@@ -592,7 +633,7 @@ class ModernTodoApp:
             check_canvas.create_oval(2, 2, check_size-2, check_size-2,
                                     outline=self.border_color, width=2)
         
-        check_canvas.bind('<Button-1>', lambda e: self.toggle_complete(index))
+        check_canvas.bind('<Button-1>', lambda e: self.toggle_complete(todo_id))
         
         # 任务文字容器 - 使其填充可用宽度
         task_container = tk.Frame(top_frame, bg="white")
@@ -612,31 +653,13 @@ class ModernTodoApp:
         task_label.pack(fill=tk.X, expand=True)
         
         # DDL信息
-        try:
-            ddl_dt = datetime.strptime(todo["ddl"], "%Y-%m-%d %H:%M")
-            time_diff = ddl_dt - datetime.now()
-            
-            if time_diff.days < 0:
-                icon = "⚠️"
-                ddl_color = self.danger_color
-                ddl_text = f"{icon} {todo['ddl']} 已过期"
-            elif time_diff.days == 0:
-                icon = "🔥"
-                ddl_color = self.warning_color
-                ddl_text = f"{icon} 今天 {ddl_dt.strftime('%H:%M')}"
-            elif time_diff.days <= 3:
-                icon = "⏰"
-                ddl_color = self.warning_color
-                ddl_text = f"{icon} {time_diff.days}天后 {ddl_dt.strftime('%H:%M')}"
-            else:
-                icon = "📅"
-                ddl_color = self.text_secondary
-                ddl_text = f"{icon} {todo['ddl']}"
-                
-        except:
-            icon = "📅"
+        urgency, ddl_text = classify_deadline(todo["ddl"])
+        if urgency == OVERDUE:
+            ddl_color = self.danger_color
+        elif urgency in (TODAY, SOON):
+            ddl_color = self.warning_color
+        else:
             ddl_color = self.text_secondary
-            ddl_text = f"{icon} {todo['ddl']}"
             
         ddl_label = tk.Label(left_frame, text=ddl_text,
                             bg="white", fg=ddl_color,
@@ -649,28 +672,16 @@ class ModernTodoApp:
         delete_canvas.pack(side=tk.RIGHT, padx=(5, 0))
         
         delete_canvas.create_text(15, 15, text="🗑️", font=("Arial", 16))
-        delete_canvas.bind('<Button-1>', lambda e: self.delete_todo(index))
+        delete_canvas.bind('<Button-1>', lambda e: self.delete_todo(todo_id))
         
         # 为卡片内的所有子组件绑定滚轮事件
         self.bind_mousewheel(content)
         self.bind_mousewheel(left_frame)
         self.bind_mousewheel(top_frame)
+        self.bind_mousewheel(card)
         
         return card
         
-    def load_todos(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-        
-    def save_todos(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.todos, f, ensure_ascii=False, indent=2)
-            
     def run(self):
         self.root.mainloop()
 
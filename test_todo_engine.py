@@ -0,0 +1,166 @@
+import json
+
+from todo_engine import TodoEngine
+
+
+TODOS = [
+    {"task": "b", "ddl": "2025-03-02 10:00", "completed": False, "created_at": "t0"},
+    {"task": "a", "ddl": "2025-03-01 09:00", "completed": True, "created_at": "t1"},
+    {"task": "c", "ddl": "2025-03-02 10:00", "completed": False, "created_at": "t2"},
+    {"task": "d", "ddl": "2025-03-01 08:00", "completed": False, "created_at": "t3"},
+    {"task": "e", "ddl": "2025-02-01 08:00", "completed": True, "created_at": "t4"},
+]
+
+
+def make_engine(tmp_path, todos=TODOS):
+    data_file = tmp_path / "todos.json"
+    data_file.write_text(json.dumps(todos, ensure_ascii=False), encoding="utf-8")
+    return TodoEngine(str(data_file))
+
+
+def baseline_order(todos):
+    # 与原 refresh_todo_list 的排序保持一致
+    pending = [(i, t) for i, t in enumerate(todos) if not t["completed"]]
+    completed = [(i, t) for i, t in enumerate(todos) if t["completed"]]
+    pending.sort(key=lambda x: x[1]["ddl"])
+    completed.sort(key=lambda x: x[1].get("completed_at", x[1]["ddl"]))
+    return [i for i, _ in pending + completed]
+
+
+def test_ordered_matches_baseline_sort(tmp_path):
+    engine = make_engine(tmp_path)
+    assert engine.ordered_ids() == baseline_order(TODOS)
+    # DDL 相同时按文件顺序
+    assert engine.ordered_ids()[1:3] == [0, 2]
+
+
+def test_next_id_across_pending_completed_boundary(tmp_path):
+    engine = make_engine(tmp_path)
+    ordered = engine.ordered_ids()
+    assert engine.next_id(2) == 4
+    assert engine.next_id(ordered[-1]) is None
+    for current, following in zip(ordered, ordered[1:]):
+        assert engine.next_id(current) == following
+
+
+def test_stats_after_toggles(tmp_path):
+    engine = make_engine(tmp_path)
+    assert engine.stats() == (5, 2, 3)
+    engine.toggle(0)
+    assert engine.stats() == (5, 3, 2)
+    engine.toggle(1)
+    engine.toggle(0)
+    assert engine.stats() == (5, 1, 4)
+    assert engine.ordered_ids() == baseline_order(engine.to_list())
+
+
+def test_update_keeps_index_consistent(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.update(3, ddl="2025-04-01 00:00")
+    assert engine.ordered_ids() == [0, 2, 3, 4, 1]
+    engine.delete(0)
+    assert engine.next_id(2) == 3
+
+
+def test_load_save_round_trip(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.save()
+    data_file = tmp_path / "todos.json"
+    assert json.loads(data_file.read_text(encoding="utf-8")) == TODOS
+
+    engine.add("f", "2025-05-01 12:00", created_at="t5")
+    reloaded = TodoEngine(str(data_file))
+    assert reloaded.to_list() == TODOS + [
+        {"task": "f", "ddl": "2025-05-01 12:00", "completed": False, "created_at": "t5"}
+    ]
+
+
+def test_failed_bulk_delete_is_its_own_undo_step(tmp_path):
+    engine = make_engine(tmp_path)
+    try:
+        engine.delete_many([0, 999])
+    except KeyError:
+        pass
+    saved = json.loads((tmp_path / "todos.json").read_text(encoding="utf-8"))
+    assert [t["task"] for t in saved] == ["a", "c", "d", "e"]
+
+    engine.toggle(2)
+    engine.undo()
+    assert 0 not in engine
+    assert engine.get(2)["completed"] is False
+    engine.undo()
+    assert 0 in engine
+
+
+def test_step_larger_than_budget_can_still_be_undone(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.history_budget = 100
+    engine.add("x", "2025-01-01 00:00")
+    engine.add_many([("y", "2025-01-01 00:00")] * 20)
+    assert engine.can_undo()
+    engine.undo()
+    assert len(engine) == 6
+    assert not engine.can_undo()
+
+
+def test_undo_restores_null_field(tmp_path):
+    todos = [dict(TODOS[1], completed_at=None)]
+    engine = make_engine(tmp_path, todos)
+    engine.update(0, completed_at="2025-03-01 10:00", note="n")
+    engine.undo()
+    assert engine.get(0) == todos[0]
+    engine.redo()
+    assert engine.get(0)["note"] == "n"
+
+
+def test_rejected_update_leaves_engine_unchanged(tmp_path):
+    engine = make_engine(tmp_path)
+    ordered = engine.ordered_ids()
+    try:
+        engine.update(0, ddl=None)
+    except TypeError:
+        pass
+    assert engine.ordered_ids() == ordered
+    assert engine.get(0)["ddl"] == "2025-03-02 10:00"
+    assert not engine.can_undo()
+
+    engine.toggle(2)
+    engine.undo()
+    assert engine.ordered_ids() == ordered
+    assert not engine.can_undo()
+
+
+def test_update_without_change_is_not_an_undo_step(tmp_path):
+    engine = make_engine(tmp_path)
+    engine.update(0, task="b", ddl="2025-03-02 10:00")
+    assert not engine.can_undo()
+
+
+def test_delete_undo_redo_restores_position(tmp_path):
+    engine = make_engine(tmp_path)
+    data_file = tmp_path / "todos.json"
+    ordered = engine.ordered_ids()
+
+    engine.delete(0)
+    assert 0 not in engine.ordered_ids()
+    engine.undo()
+    assert engine.ordered_ids() == ordered
+    assert engine.get(0) == TODOS[0]
+    assert json.loads(data_file.read_text(encoding="utf-8")) == TODOS
+
+    engine.redo()
+    assert engine.ordered_ids() == [i for i in ordered if i != 0]
+    assert json.loads(data_file.read_text(encoding="utf-8")) == TODOS[1:]
+
+
+def test_clear_completed_undoes_as_one_step(tmp_path):
+    engine = make_engine(tmp_path)
+    ordered = engine.ordered_ids()
+    engine.clear_completed()
+    assert engine.stats() == (3, 0, 3)
+    engine.undo()
+    assert engine.ordered_ids() == ordered
+    assert engine.stats() == (5, 2, 3)
+    assert not engine.can_undo()
+    engine.redo()
+    assert engine.stats() == (3, 0, 3)
@@ -0,0 +1,401 @@
+"""待办数据核心：存储、索引、查询与截止时间分级，不依赖 tkinter"""
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime
+import json
+import os
+import sys
+
+# 截止时间紧急程度
+OVERDUE = "overdue"
+TODAY = "today"
+SOON = "soon"
+NORMAL = "normal"
+
+DDL_FORMAT = "%Y-%m-%d %H:%M"
+
+# 撤销历史默认内存预算（字节）
+DEFAULT_HISTORY_BUDGET = 256 * 1024
+
+# 撤销记录中表示“该字段原本不存在”
+_MISSING = object()
+
+
+def classify_deadline(ddl, now=None):
+    """根据截止时间返回 (紧急程度, 显示文字)"""
+    if now is None:
+        now = datetime.now()
+    try:
+        ddl_dt = datetime.strptime(ddl, DDL_FORMAT)
+    except (TypeError, ValueError):
+        return NORMAL, f"📅 {ddl}"
+
+    time_diff = ddl_dt - now
+    if time_diff.days < 0:
+        return OVERDUE, f"⚠️ {ddl} 已过期"
+    if time_diff.days == 0:
+        return TODAY, f"🔥 今天 {ddl_dt.strftime('%H:%M')}"
+    if time_diff.days <= 3:
+        return SOON, f"⏰ {time_diff.days}天后 {ddl_dt.strftime('%H:%M')}"
+    return NORMAL, f"📅 {ddl}"
+
+
+def classify_many(ddls, now=None):
+    """批量分级，可直接交给进程池使用"""
+    if now is None:
+        now = datetime.now()
+    return [classify_deadline(ddl, now)[0] for ddl in ddls]
+
+
+class TodoEngine:
+    """待办事项核心，界面通过 subscribe 订阅变更事件
+
+    每条待办在内存中有一个稳定的整数 id（按加载/创建顺序递增），
+    持久化时按 id 顺序写回，文件格式与之前保持一致。
+    事件回调签名为 callback(event, todo_id, todo)，event 取值：
+    "added"、"updated"、"removed"，以及重新加载时的 "reset"。
+
+    get / ordered / query 返回的是内部字典本身，只能读取；修改字段必须
+    通过 update 等方法，否则索引、事件、持久化和撤销都会失效。
+
+    撤销/重做只记录每次修改的增量（插入、删除、字段旧值/新值），
+    历史总大小受 history_budget 限制，超出时丢弃最早的记录（最近一次总会保留）。
+    """
+
+    def __init__(self, data_file="todos.json", autosave=True,
+                 history_budget=DEFAULT_HISTORY_BUDGET):
+        self.data_file = data_file
+        self.autosave = autosave
+        self.history_budget = history_budget
+        self._listeners = []
+        self.load()
+
+    # ---------- 持久化 ----------
+
+    def load(self):
+        """从文件加载并重建索引"""
+        todos = []
+        if self.data_file and os.path.exists(self.data_file):
+            try:
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    todos = json.load(f)
+            except (OSError, ValueError):
+                todos = []
+
+        self._items = {}
+        self._pending_index = []
+        self._completed_index = []
+        self._completed_count = 0
+        self._next_id = 0
+        self.clear_history()
+        self._recording = False
+        for todo in todos:
+            self._insert(self._new_id(), todo, notify=False)
+        self._recording = True
+        self._emit("reset", None, None)
+
+    def save(self):
+        if not self.data_file:
+            return
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_list(), f, ensure_ascii=False, indent=2)
+
+    def to_list(self):
+        """按原始顺序返回所有待办"""
+        return [self._items[todo_id] for todo_id in sorted(self._items)]
+
+    # ---------- 事件 ----------
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event, todo_id, todo):
+        for callback in list(self._listeners):
+            callback(event, todo_id, todo)
+
+    # ---------- 查询 ----------
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, todo_id):
+        return todo_id in self._items
+
+    def get(self, todo_id):
+        """返回待办字典（只读，修改请用 update）"""
+        return self._items[todo_id]
+
+    def stats(self):
+        """返回 (总数, 已完成, 待完成)"""
+        total = len(self._items)
+        return total, self._completed_count, total - self._completed_count
+
+    def ordered_ids(self):
+        """显示顺序：未完成按DDL，已完成按完成时间（没有则按DDL）"""
+        return ([todo_id for _, todo_id in self._pending_index] +
+                [todo_id for _, todo_id in self._completed_index])
+
+    def ordered(self):
+        return [(todo_id, self._items[todo_id]) for todo_id in self.ordered_ids()]
+
+    def next_id(self, todo_id):
+        """显示顺序中排在 todo_id 之后的待办 id，没有则返回 None"""
+        todo = self._items[todo_id]
+        index = self._index_for(todo)
+        pos = bisect_left(index, (self._sort_key(todo), todo_id)) + 1
+        if pos < len(index):
+            return index[pos][1]
+        if index is self._pending_index and self._completed_index:
+            return self._completed_index[0][1]
+        return None
+
+    def query(self, completed=None, keyword=None, urgency=None, now=None):
+        """按完成状态、关键字、紧急程度筛选，结果保持显示顺序"""
+        if completed is True:
+            ids = [todo_id for _, todo_id in self._completed_index]
+        elif completed is False:
+            ids = [todo_id for _, todo_id in self._pending_index]
+        else:
+            ids = self.ordered_ids()
+
+        if urgency is not None and now is None:
+            now = datetime.now()
+
+        result = []
+        for todo_id in ids:
+            todo = self._items[todo_id]
+            if keyword and keyword not in todo["task"]:
+                continue
+            if urgency is not None and classify_deadline(todo["ddl"], now)[0] != urgency:
+                continue
+            result.append((todo_id, todo))
+        return result
+
+    # ---------- 修改 ----------
+
+    def add(self, task, ddl, created_at=None):
+        todo_id = self._add(task, ddl, created_at)
+        self._commit()
+        return todo_id
+
+    def update(self, todo_id, **fields):
+        """修改任意字段，例如 update(todo_id, ddl="2025-01-01 12:00")"""
+        if todo_id not in self._items:
+            raise KeyError(todo_id)
+        try:
+            if fields:
+                self._update(todo_id, fields)
+        finally:
+            self._commit()
+
+    def toggle(self, todo_id):
+        todo = self._items[todo_id]
+        self._update(todo_id, {"completed": not todo["completed"]})
+        self._commit()
+
+    def delete(self, todo_id):
+        todo = self._remove(todo_id)
+        self._commit()
+        return todo
+
+    def add_many(self, entries):
+        """批量添加 (task, ddl) 列表，只写一次文件"""
+        # 中途出错时也要把已完成的部分记入历史并保存
+        ids = []
+        try:
+            for task, ddl in entries:
+                ids.append(self._add(task, ddl))
+        finally:
+            self._commit()
+        return ids
+
+    def set_completed_many(self, todo_ids, completed=True):
+        try:
+            for todo_id in todo_ids:
+                if self._items[todo_id]["completed"] != completed:
+                    self._update(todo_id, {"completed": completed})
+        finally:
+            self._commit()
+
+    def delete_many(self, todo_ids):
+        removed = []
+        try:
+            for todo_id in list(todo_ids):
+                removed.append(self._remove(todo_id))
+        finally:
+            self._commit()
+        return removed
+
+    def clear_completed(self):
+        return self.delete_many([todo_id for _, todo_id in self._completed_index])
+
+    def _commit(self):
+        step, self._step = self._step, []
+        if step:
+            self._push_history(step)
+        if self.autosave:
+            self.save()
+
+    # ---------- 撤销/重做 ----------
+
+    def can_undo(self):
+        return bool(self._undo_stack)
+
+    def can_redo(self):
+        return bool(self._redo_stack)
+
+    def undo(self):
+        """撤销最近一次修改（批量操作算一次），没有可撤销的返回 False"""
+        if not self._undo_stack:
+            return False
+        step, size = self._undo_stack.pop()
+        self._replay(reversed(step), undo=True)
+        self._redo_stack.append((step, size))
+        self._commit()
+        return True
+
+    def redo(self):
+        if not self._redo_stack:
+            return False
+        step, size = self._redo_stack.pop()
+        self._replay(step, undo=False)
+        self._undo_stack.append((step, size))
+        self._commit()
+        return True
+
+    def clear_history(self):
+        self._step = []
+        self._undo_stack = deque()
+        self._redo_stack = []
+        self._history_size = 0
+
+    def _push_history(self, step):
+        size = sum(self._delta_size(delta) for delta in step)
+        self._undo_stack.append((step, size))
+        self._history_size += size
+        for _, redo_size in self._redo_stack:
+            self._history_size -= redo_size
+        self._redo_stack = []
+        while len(self._undo_stack) > 1 and self._history_size > self.history_budget:
+            _, old_size = self._undo_stack.popleft()
+            self._history_size -= old_size
+
+    def _replay(self, step, undo):
+        # 回放时走与普通修改相同的增量路径，但不再记录历史
+        self._recording = False
+        try:
+            for kind, todo_id, before, after in step:
+                if kind == "insert":
+                    if undo:
+                        self._remove(todo_id)
+                    else:
+                        self._insert(todo_id, after)
+                elif kind == "remove":
+                    if undo:
+                        self._insert(todo_id, before)
+                    else:
+                        self._remove(todo_id)
+                else:
+                    self._update(todo_id, before if undo else after)
+        finally:
+            self._recording = True
+
+    @staticmethod
+    def _delta_size(delta):
+        # 粗略估算：增量元组本身加上其引用的字典和字段值
+        size = sys.getsizeof(delta)
+        for part in delta[2:]:
+            if part is not None:
+                size += sys.getsizeof(part)
+                size += sum(sys.getsizeof(value) for value in part.values()
+                            if value is not _MISSING)
+        return size
+
+    # ---------- 内部增量操作 ----------
+
+    def _new_id(self):
+        todo_id = self._next_id
+        self._next_id += 1
+        return todo_id
+
+    def _add(self, task, ddl, created_at=None):
+        todo = {
+            "task": task,
+            "ddl": ddl,
+            "completed": False,
+            "created_at": created_at or datetime.now().isoformat()
+        }
+        todo_id = self._new_id()
+        self._insert(todo_id, todo)
+        return todo_id
+
+    @staticmethod
+    def _sort_key(todo):
+        if todo["completed"]:
+            return todo.get("completed_at", todo["ddl"])
+        return todo["ddl"]
+
+    def _index_for(self, todo):
+        return self._completed_index if todo["completed"] else self._pending_index
+
+    def _index_add(self, todo_id, todo):
+        insort(self._index_for(todo), (self._sort_key(todo), todo_id))
+        if todo["completed"]:
+            self._completed_count += 1
+
+    def _index_discard(self, todo_id, todo):
+        index = self._index_for(todo)
+        del index[bisect_left(index, (self._sort_key(todo), todo_id))]
+        if todo["completed"]:
+            self._completed_count -= 1
+
+    def _record(self, kind, todo_id, before, after):
+        if self._recording:
+            self._step.append((kind, todo_id, before, after))
+
+    def _insert(self, todo_id, todo, notify=True):
+        self._items[todo_id] = todo
+        self._index_add(todo_id, todo)
+        self._record("insert", todo_id, None, todo)
+        if notify:
+            self._emit("added", todo_id, todo)
+
+    def _remove(self, todo_id):
+        todo = self._items.pop(todo_id)
+        self._index_discard(todo_id, todo)
+        self._record("remove", todo_id, todo, None)
+        self._emit("removed", todo_id, todo)
+        return todo
+
+    def _update(self, todo_id, changes):
+        # changes 中值为 _MISSING 表示删除该字段（撤销新增字段时使用）
+        todo = self._items[todo_id]
+        # 值没有变化的字段不记录，全部相同则不产生撤销步骤
+        changes = {key: value for key, value in changes.items()
+                   if todo.get(key, _MISSING) != value}
+        if not changes:
+            return
+        before = {key: todo.get(key, _MISSING) for key in changes}
+        self._index_discard(todo_id, todo)
+        try:
+            self._apply(todo, changes)
+            self._index_add(todo_id, todo)
+        except Exception:
+            # 新值无法参与排序（如 ddl=None）时回滚，保证索引完整
+            self._apply(todo, before)
+            self._index_add(todo_id, todo)
+            raise
+        self._record("update", todo_id, before, dict(changes))
+        self._emit("updated", todo_id, todo)
+
+    @staticmethod
+    def _apply(todo, changes):
+        for key, value in changes.items():
+            if value is _MISSING:
+                todo.pop(key, None)
+            else:
+                todo[key] = value